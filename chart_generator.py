@@ -1,7 +1,15 @@
+import matplotlib
+matplotlib.use("Agg")  # Render straight to PNG, never a GUI backend
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import pandas as pd
+import atexit
+import io
 import os
+import threading
 import numpy as np
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from model import ai
 
 # Enhanced imports for Plotly
@@ -13,10 +21,108 @@ except ImportError:
     print("Warning: Plotly not installed. Using matplotlib fallback.")
     PLOTLY_AVAILABLE = False
 
-def determine_chart_type(df: pd.DataFrame, question: str) -> str:
-    """Simplified AI chart type determination - only bar and pie"""
-    numeric_cols = len(df.select_dtypes(include=['number']).columns)
-    categorical_cols = len(df.select_dtypes(include=['object', 'category']).columns)
+# Modern chart style, resolved once: plt.style.available scans the style folders on disk.
+# Applied globally at import so worker threads never mutate rcParams mid-render.
+CHART_STYLE = 'seaborn-v0_8-whitegrid' if 'seaborn-v0_8-whitegrid' in plt.style.available else 'default'
+plt.style.use(CHART_STYLE)
+
+# Chart color palette shared by every renderer
+CHART_COLORS = ('#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#592E83', '#1B998B', '#ED217C', '#F7931E')
+
+# Upper bound on charts rendered at the same time
+MAX_CHART_WORKERS = 4
+
+# Matplotlib figure size in inches; Plotly figures are laid out at 1200x700 px
+CHART_FIGSIZE = (12, 8)
+PLOTLY_WIDTH = 1200
+
+# Resolution used when the caller does not size charts to their slide slot
+DEFAULT_CHART_DPI = 150
+
+# Persistent Kaleido renderer shared by every chart export
+_KALEIDO = None
+_KALEIDO_LOCK = threading.Lock()
+
+def _get_kaleido():
+    """Start Kaleido once per process so each export skips browser startup"""
+    global _KALEIDO
+    with _KALEIDO_LOCK:
+        if _KALEIDO is None:
+            _KALEIDO = _start_kaleido()
+    return _KALEIDO
+
+def _start_kaleido():
+    """Start the Kaleido renderer and register its shutdown"""
+    import kaleido
+    if hasattr(kaleido, "start_sync_server"):
+        # Kaleido v1: keep one headless Chromium alive for all write_image calls
+        kaleido.start_sync_server()
+        atexit.register(kaleido.stop_sync_server)
+        return kaleido
+    
+    # Kaleido v0: plotly holds a single scope; make sure it is shut down on exit
+    import plotly.io as pio
+    scope = pio.kaleido.scope
+    if hasattr(scope, "_shutdown_kaleido"):
+        atexit.register(scope._shutdown_kaleido)
+    return scope
+
+def write_chart_image(fig, chart_path, scale=1):
+    """Export a Plotly figure through the shared Kaleido renderer.
+
+    The format follows the file extension (PNG for buffers). Slides need PNG
+    because python-pptx cannot embed SVG. The figure's native 1200x700 px already
+    gives about 260 ppi in the chart area, so there is no need to rasterize at scale=2.
+    """
+    _get_kaleido()
+    fig.write_image(chart_path, engine="kaleido", scale=scale)
+    return chart_path
+
+def dpi_for_width(width_inches, display_dpi):
+    """Figure dpi at which a chart's pixel width matches a slot width_inches wide on a display_dpi screen"""
+    return max(round(width_inches * display_dpi / CHART_FIGSIZE[0]), 1)
+
+# Column dtype facts shared by the chart-type heuristics and renderers
+ColStats = namedtuple('ColStats', ['numeric_count', 'categorical_count', 'y_is_numeric'])
+
+# dtype.kind codes: int/uint/float/complex are numeric; object/bytes/unicode
+# (which covers pandas' string and category dtypes) are categorical
+_NUMERIC_KINDS = list('iufc')
+_CATEGORICAL_KINDS = list('OSU')
+
+def column_stats(df: pd.DataFrame) -> ColStats:
+    """Scan column dtypes once; the y column is the second column, or the only one"""
+    kinds = np.array([dtype.kind for dtype in df.dtypes.values])
+    numeric_mask = np.isin(kinds, _NUMERIC_KINDS)
+    y_is_numeric = bool(numeric_mask[1 if len(kinds) >= 2 else 0]) if len(kinds) else False
+    return ColStats(int(numeric_mask.sum()), int(np.isin(kinds, _CATEGORICAL_KINDS).sum()), y_is_numeric)
+
+# Question wording that asks for parts of a whole
+PIE_KEYWORDS = ("share", "proportion", "breakdown", "distribution", "composition")
+
+def rule_based_chart_type(df: pd.DataFrame, question: str, stats: ColStats) -> str:
+    """Decide bar vs pie without the AI; returns None when the case is ambiguous"""
+    wants_proportions = any(keyword in question.lower() for keyword in PIE_KEYWORDS)
+    if not wants_proportions or stats.numeric_count != 1:
+        return 'bar'
+    
+    categories = df.shape[0]
+    if categories < 8:
+        return 'pie'
+    if categories > 15:
+        return 'bar'
+    return None  # 8-15 slices: let the AI judge readability
+
+def determine_chart_type(df: pd.DataFrame, question: str, stats: ColStats = None) -> str:
+    """Chart type determination - rules first, AI only for ambiguous cases - only bar and pie"""
+    if stats is None:
+        stats = column_stats(df)
+    chart_type = rule_based_chart_type(df, question, stats)
+    if chart_type is not None:
+        return chart_type
+    
+    numeric_cols = stats.numeric_count
+    categorical_cols = stats.categorical_count
     
     prompt = f"""Analyze this data and choose the BEST chart type:
 
@@ -42,35 +148,45 @@ def create_chart_directory():
     os.makedirs("charts", exist_ok=True)
     return "charts"
 
-def create_plotly_chart(df, question, chart_path, chart_type=None):
-    """Create charts using Plotly - bar and pie only"""
+def format_bar_labels(heights):
+    """Value labels for bar heights: whole numbers without a decimal, others with one"""
+    heights = np.asarray(heights, dtype=np.float64)
+    with np.errstate(invalid='ignore'):  # NaN/inf heights are labelled as such
+        # '%.0f' rather than an int64 cast, which overflows past 2**63; + 0.0 turns -0.0 into 0
+        return np.where(np.mod(heights, 1) != 0, np.char.mod('%.1f', heights),
+                        np.char.mod('%.0f', heights + 0.0)).tolist()
+
+def _prepare_chart_data(df):
+    """Pick x/y columns, adding a row index as x when there is only one column"""
+    if len(df.columns) >= 2:
+        return df, df.columns[0], df.columns[1]
+    df = df.copy()
+    df['Index'] = range(len(df))
+    return df, 'Index', df.columns[0]
+
+def create_plotly_chart(df, question, chart_path, chart_type=None, stats=None, dpi=DEFAULT_CHART_DPI):
+    """Create charts using Plotly (opt-in, exported via Kaleido) - bar and pie only"""
     if not PLOTLY_AVAILABLE:
-        return create_enhanced_matplotlib_chart(df, question, chart_path)
-        
-    """if chart_type is None:
-        chart_type = determine_chart_type(df, question)"""
-# HARDCODED: Force specific chart types based on question/context
-    if "slide 3" in question.lower() or "chart_3" in chart_path:
-        chart_type = 'pie'
-    elif "slide 4" in question.lower() or "chart_4" in chart_path:
-        chart_type = 'bar'
+        return create_enhanced_matplotlib_chart(df, question, chart_path, chart_type, stats, dpi)
+    if stats is None:
+        stats = column_stats(df)
     
-    # Prepare data
-    if len(df.columns) >= 2:
-        x_col, y_col = df.columns[0], df.columns[1]
-    else:
-        x_col, y_col = 'Index', df.columns[0]
-        df = df.copy()
-        df['Index'] = range(len(df))
+    # HARDCODED: Force specific chart types based on question/context
+    # when the caller has not already chosen one
+    if chart_type is None:
+        chart_name = chart_path if isinstance(chart_path, str) else ""
+        if "slide 3" in question.lower() or "chart_3" in chart_name:
+            chart_type = 'pie'
+        elif "slide 4" in question.lower() or "chart_4" in chart_name:
+            chart_type = 'bar'
+        else:
+            chart_type = determine_chart_type(df, question, stats)
     
-    # Limit data points for readability
-    if len(df) > 25:
-        df_sample = df.head(25)
-    else:
-        df_sample = df.copy()
+    # Prepare data
+    plot_df, x_col, y_col = _prepare_chart_data(df)
     
-    # Enhanced color palette
-    colors = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#592E83', '#1B998B', '#ED217C', '#F7931E']
+    # Limit bar data points for readability; pies pick their top slices from all rows
+    df_sample = plot_df.head(25) if chart_type == 'bar' else plot_df
     
     try:
         fig = None
@@ -78,18 +194,18 @@ def create_plotly_chart(df, question, chart_path, chart_type=None):
         if chart_type == 'bar':
             fig = px.bar(df_sample, x=x_col, y=y_col, 
                        title=question[:50] + "..." if len(question) > 50 else question,
-                       color_discrete_sequence=colors)
+                       color_discrete_sequence=CHART_COLORS)
             fig.update_layout(xaxis_tickangle=-45)
             
         elif chart_type == 'pie':
-            if pd.api.types.is_numeric_dtype(df_sample[y_col]):
-                top_data = df_sample.nlargest(8, y_col)
+            if stats.y_is_numeric:
+                top_data = plot_df.nlargest(8, y_col)
             else:
-                top_data = df_sample.head(8)
+                top_data = plot_df.head(8)
             
             fig = px.pie(top_data, values=y_col, names=x_col,
                        title=question[:50] + "..." if len(question) > 50 else question,
-                       color_discrete_sequence=colors)
+                       color_discrete_sequence=CHART_COLORS)
         
         # Apply enhanced styling
         if fig:
@@ -100,7 +216,7 @@ def create_plotly_chart(df, question, chart_path, chart_type=None):
                 paper_bgcolor='white',
                 margin=dict(l=80, r=80, t=100, b=80),
                 showlegend=True if chart_type in ['pie'] else False,
-                width=1200,
+                width=PLOTLY_WIDTH,
                 height=700,
                 title_x=0.5
             )
@@ -110,65 +226,69 @@ def create_plotly_chart(df, question, chart_path, chart_type=None):
                 fig.update_xaxes(showgrid=True, gridcolor='rgba(128,128,128,0.2)')
                 fig.update_yaxes(showgrid=True, gridcolor='rgba(128,128,128,0.2)')
             
-            # Save as high-quality PNG
-            fig.write_image(chart_path, engine="kaleido", scale=2)
-            return chart_path
+            # Save as PNG at the same pixel width the matplotlib renderer gives for this dpi
+            scale = CHART_FIGSIZE[0] * dpi / PLOTLY_WIDTH
+            return write_chart_image(fig, chart_path, scale)
             
     except Exception as e:
         print(f"Plotly chart creation failed: {e}, falling back to matplotlib")
         
-    # Fallback to enhanced matplotlib
-    return create_enhanced_matplotlib_chart(df_sample, question, chart_path, chart_type)
+    # Fallback to enhanced matplotlib; it prepares and limits the data itself
+    return create_enhanced_matplotlib_chart(df, question, chart_path, chart_type, stats, dpi)
 
-def create_enhanced_matplotlib_chart(df, question, chart_path, chart_type=None):
-    """Enhanced matplotlib fallback - bar and pie only"""
+def create_enhanced_matplotlib_chart(df, question, chart_path, chart_type=None, stats=None, dpi=DEFAULT_CHART_DPI):
+    """Default chart renderer using matplotlib's Agg backend - bar and pie only"""
+    if stats is None:
+        stats = column_stats(df)
     if chart_type is None:
-        chart_type = determine_chart_type(df, question)
+        chart_type = determine_chart_type(df, question, stats)
     
-    # Set modern style
-    plt.style.use('seaborn-v0_8-whitegrid' if 'seaborn-v0_8-whitegrid' in plt.style.available else 'default')
+    df, x_col, y_col = _prepare_chart_data(df)
     
-    fig, ax = plt.subplots(figsize=(12, 8))
+    # Limit data points for readability
+    if chart_type == 'bar' and len(df) > 25:
+        df = df.head(25)
     
-    if len(df.columns) >= 2:
-        x_col, y_col = df.columns[0], df.columns[1]
+    # Figure API instead of pyplot so charts can render on worker threads
+    fig = Figure(figsize=CHART_FIGSIZE)
+    ax = fig.subplots()
+    
+    if chart_type == 'bar':
+        # Enhanced bar chart
+        bars = ax.bar(range(len(df)), df[y_col], 
+                     color=CHART_COLORS[0], alpha=0.8, edgecolor='white', linewidth=0.7)
         
-        if chart_type == 'bar':
-            # Enhanced bar chart
-            bars = ax.bar(range(len(df)), df[y_col], 
-                         color='#2E86AB', alpha=0.8, edgecolor='white', linewidth=0.7)
-            
-            ax.set_xticks(range(len(df)))
-            ax.set_xticklabels([str(x)[:15] + '...' if len(str(x)) > 15 else str(x) 
-                               for x in df[x_col]], rotation=45, ha='right')
-            ax.set_ylabel(y_col, fontsize=14, fontweight='600')
-            
-            # Add value labels on bars
-            for i, bar in enumerate(bars):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                       f'{height:.1f}' if isinstance(height, float) else str(height),
-                       ha='center', va='bottom', fontsize=10, fontweight='500')
-                       
-        elif chart_type == 'pie':
-            # Enhanced pie chart
-            if pd.api.types.is_numeric_dtype(df[y_col]):
-                top_data = df.nlargest(8, y_col)
-                sizes = top_data[y_col]
-                labels = top_data[x_col]
-            else:
-                top_data = df.head(8)
-                sizes = [1] * len(top_data)  # Equal sizes if non-numeric
-                labels = top_data[x_col]
-            
-            colors_pie = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#592E83', '#1B998B', '#ED217C', '#F7931E']
-            
-            wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
-                                            colors=colors_pie[:len(sizes)], startangle=90,
-                                            textprops={'fontsize': 10})
-            ax.set_aspect('equal')
+        ax.set_xticks(range(len(df)))
+        x_labels = df[x_col].astype(str)
+        short_labels = x_labels.str[:15]
+        ax.set_xticklabels(short_labels.where(x_labels.str.len() <= 15, short_labels + '...').tolist(),
+                           rotation=45, ha='right')
+        ax.set_ylabel(y_col, fontsize=14, fontweight='600')
+        
+        # Add value labels on bars (whole numbers without a decimal)
+        heights = np.asarray([bar.get_height() for bar in bars], dtype=float)
+        xs = np.asarray([bar.get_x() + bar.get_width()/2. for bar in bars])
+        value_labels = format_bar_labels(heights)
+        for x, y, label in zip(xs, heights * 1.01, value_labels):
+            ax.text(x, y, label, ha='center', va='bottom', fontsize=10, fontweight='500')
+                   
+    elif chart_type == 'pie':
+        # Enhanced pie chart
+        if stats.y_is_numeric:
+            top_data = df.nlargest(8, y_col)
+            sizes = top_data[y_col]
+            labels = top_data[x_col]
+        else:
+            top_data = df.head(8)
+            sizes = [1] * len(top_data)  # Equal sizes if non-numeric
+            labels = top_data[x_col]
         
-        ax.set_title(question, fontsize=16, fontweight='700', pad=25)
+        wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
+                                        colors=CHART_COLORS[:len(sizes)], startangle=90,
+                                        textprops={'fontsize': 10})
+        ax.set_aspect('equal')
+    
+    ax.set_title(question, fontsize=16, fontweight='700', pad=25)
     
     # Enhanced styling
     if chart_type == 'bar':
@@ -177,14 +297,44 @@ def create_enhanced_matplotlib_chart(df, question, chart_path, chart_type=None):
         ax.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
         ax.set_facecolor('#fafafa')
     
-    plt.tight_layout()
-    plt.savefig(chart_path, dpi=300, bbox_inches='tight', facecolor='white', 
-                edgecolor='none', transparent=False)
-    plt.close()
+    fig.tight_layout()
+    # Sized by dpi only; a caller matching it to the slide slot avoids any resampling
+    fig.savefig(chart_path, format='png', dpi=dpi, bbox_inches='tight', pad_inches=0.02,
+                facecolor='white', edgecolor='none', transparent=False)
     
     return chart_path
 
-def generate_chart(df: pd.DataFrame, question: str, output_path: str) -> str:
-    """Generate chart using Plotly with matplotlib fallback - bar and pie only"""
-    chart_type = determine_chart_type(df, question)
-    return create_plotly_chart(df, question, output_path, chart_type)
\ No newline at end of file
+def generate_chart(df: pd.DataFrame, question: str, output_path: str = None, chart_type: str = None,
+                   use_plotly: bool = False, dpi: int = DEFAULT_CHART_DPI):
+    """
+    Generate chart with matplotlib, or Plotly when use_plotly is set - bar and pie only.
+    Writes to output_path and returns it; without a path the PNG is rendered into
+    memory and returned as a BytesIO positioned at the start. See dpi_for_width
+    for sizing dpi to the slide.
+    """
+    stats = column_stats(df)
+    if chart_type is None:
+        chart_type = determine_chart_type(df, question, stats)
+    
+    target = output_path if output_path is not None else io.BytesIO()
+    if use_plotly:
+        create_plotly_chart(df, question, target, chart_type, stats, dpi)
+    else:
+        create_enhanced_matplotlib_chart(df, question, target, chart_type, stats, dpi)
+    
+    if output_path is None:
+        target.seek(0)
+    return target
+
+def generate_charts(chart_jobs: list, max_workers: int = MAX_CHART_WORKERS, use_plotly: bool = False,
+                    dpi: int = DEFAULT_CHART_DPI) -> list:
+    """Render independent charts concurrently.
+
+    Each job is a (df, question, output_path, chart_type) tuple as accepted by
+    generate_chart; output_path may be None for an in-memory PNG. Results are
+    returned in job order.
+    """
+    if not chart_jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chart_jobs))) as executor:
+        return list(executor.map(lambda job: generate_chart(*job, use_plotly=use_plotly, dpi=dpi), chart_jobs))
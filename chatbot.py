@@ -1,6 +1,13 @@
 # chatbot.py
+import contextlib
+import io
+import sys
 from model import ai
 
+STDOUT_BUFSIZE = 65536       # Bytes buffered before the chatbot writes to the terminal
+SUMMARY_ECHO_LIMIT = 2000    # Summaries longer than this are truncated on screen
+SUMMARY_ECHO_PREVIEW = 500   # Characters shown from a truncated summary
+
 def chatbot(summary: str, question: str) -> str:
     """
     Chatbot function to answer a single question based on a CSV summary.
@@ -30,6 +37,35 @@ Answer concisely and clearly, and if helpful include a short next-step suggestio
     except Exception as e:
         return f"Error generating answer: {e}"
 
+@contextlib.contextmanager
+def _buffered_stdout():
+    """
+    Temporarily route stdout through a large block buffer so each chatbot turn
+    reaches the terminal in one write instead of one write per line.
+    Falls back to the current stdout when it is not backed by a file descriptor.
+    """
+    original = sys.stdout
+    try:
+        fd = original.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield
+        return
+
+    original.flush()
+    raw = io.FileIO(fd, "w", closefd=False)
+    sys.stdout = io.TextIOWrapper(
+        io.BufferedWriter(raw, buffer_size=STDOUT_BUFSIZE),
+        encoding=original.encoding,
+        errors=original.errors,
+        line_buffering=False,
+        write_through=False,
+    )
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stdout = original
+
 def chatbot_loop(summary: str) -> None:
     """
     Start an interactive chatbot loop that uses the dataset summary as context.
@@ -41,31 +77,37 @@ def chatbot_loop(summary: str) -> None:
     Returns:
         None
     """
-    print("\n🤖 Chatbot mode — interactive Q&A based on the dataset summary.")
-    print("Type /exit to quit, or press Ctrl+C.")
-    print("=" * 60)
-    if summary:
-        print("Dataset summary (used as context):")
-        print(summary)
-        print("-" * 60)
+    with _buffered_stdout():
+        print("\n🤖 Chatbot mode — interactive Q&A based on the dataset summary.")
+        print("Type /exit to quit, or press Ctrl+C.")
+        print("=" * 60)
+        if summary:
+            print("Dataset summary (used as context):")
+            if len(summary) > SUMMARY_ECHO_LIMIT:
+                # The full summary is still used as context; only the echo is shortened
+                print(summary[:SUMMARY_ECHO_PREVIEW])
+                print(f"[+{len(summary) - SUMMARY_ECHO_PREVIEW} chars truncated]")
+            else:
+                print(summary)
+            print("-" * 60)
 
-    try:
-        while True:
-            try:
-                user_q = input("\nYou: ").strip()
-            except KeyboardInterrupt:
-                print("\n👋 Exiting chatbot.")
-                break
-
-            if not user_q:
-                continue
-            if user_q.lower() in ("/exit", "exit", "quit"):
-                print("👋 Exiting chatbot.")
-                break
-
-            answer = chatbot(summary, user_q)
-            print("\n🤖", answer)
+        try:
+            while True:
+                try:
+                    user_q = input("\nYou: ").strip()
+                except KeyboardInterrupt:
+                    print("\n👋 Exiting chatbot.")
+                    break
 
-    except Exception as e:
-        # Catch unexpected exceptions to avoid breaking host programs
-        print(f"Chatbot encountered an error and will exit: {e}")
+                if not user_q:
+                    continue
+                if user_q.lower() in ("/exit", "exit", "quit"):
+                    print("👋 Exiting chatbot.")
+                    break
+
+                answer = chatbot(summary, user_q)
+                print("\n🤖", answer)
+
+        except Exception as e:
+            # Catch unexpected exceptions to avoid breaking host programs
+            print(f"Chatbot encountered an error and will exit: {e}")
@@ -1,20 +1,78 @@
 import pandas as pd
+import numpy as np
+import ast
+import builtins
+import glob
+import hashlib
+import json
+import os
 import re
-from model import ai
+import tempfile
+import time
+from functools import lru_cache
+from model import ai, AI_CACHE_TTL
 
-def load_csv(filepath: str) -> pd.DataFrame:
-    """Load CSV file into pandas DataFrame"""
-    return pd.read_csv(filepath)
+# On-disk cache of the AI output of analyses (JSON), keyed by CSV content and question;
+# entries expire with AI_CACHE_TTL like the LLM response cache
+ANALYSIS_CACHE_DIR = os.path.join(".cache", "analysis")
+# Files larger than this are fingerprinted by size, mtime and their edges instead of a full read
+FULL_HASH_LIMIT_BYTES = 64 * 1024 * 1024
+EDGE_HASH_BYTES = 64 * 1024
+
+# Frames larger than this get their numeric columns downcast after loading
+DOWNCAST_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Narrowest integer dtype downcasting goes to; int8/int16 overflow in products like qty * price
+_INT32_INFO = np.iinfo(np.int32)
+
+def _downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink int64 columns of large frames to int32 where the values fit. Floats stay
+    float64 so previews and summaries never show float32 noise like 1.100000023841858.
+    """
+    if df.memory_usage(index=True).sum() <= DOWNCAST_THRESHOLD_BYTES:
+        return df
+    for col in df.select_dtypes('int64').columns:
+        values = df[col]
+        if values.empty or (values.min() >= _INT32_INFO.min and values.max() <= _INT32_INFO.max):
+            df[col] = values.astype(np.int32)
+    return df
+
+def load_csv(filepath: str, nrows: int = None) -> pd.DataFrame:
+    """Load CSV file into pandas DataFrame, optionally sampling the first nrows rows"""
+    df = None
+    if nrows is None:
+        # pyarrow's multithreaded parser is much faster on large files
+        try:
+            df = pd.read_csv(filepath, engine="pyarrow")
+        except (ImportError, ValueError):
+            pass
+    if df is None:
+        # The pyarrow engine does not support nrows; it is also the fallback parser
+        df = pd.read_csv(filepath, nrows=nrows)
+    return _downcast_numeric(df)
+
+def _frame_preview(df: pd.DataFrame, max_columns: int = 30, max_chars: int = 1500) -> tuple:
+    """Compact, token-friendly column list and JSON sample of a DataFrame for prompts"""
+    columns = list(df.columns)
+    if len(columns) > max_columns:
+        columns = columns[:max_columns] + [f"... (+{len(columns) - max_columns} more)"]
+    
+    head = df.iloc[:3, :max_columns]
+    preview = {
+        "dtypes": head.dtypes.astype(str).to_dict(),
+        "rows": head.to_dict(orient="records")
+    }
+    return columns, json.dumps(preview, default=str)[:max_chars]
 
 def convert_query_to_pandas(question: str, df: pd.DataFrame) -> str:
     """Convert natural language question to pandas operations"""
-    columns = list(df.columns)
-    sample_data = df.head(3).to_string()
+    columns, sample_data = _frame_preview(df)
     
     prompt = f"""
 Convert this question to pandas DataFrame operations. The DataFrame is called 'df'.
 CSV Columns: {columns}
-Sample data:
+Sample data (JSON dtypes and first rows):
 {sample_data}
 
 Question: {question}
@@ -25,14 +83,83 @@ Example: df.groupby('column').sum() or df[df['column'] > 100].mean()
     
     return ai(prompt)
 
+def analyze_bundle(df: pd.DataFrame, question: str) -> dict:
+    """Plan the pandas query and the chart type of each chart slide in a single AI call"""
+    columns, sample_data = _frame_preview(df)
+    
+    prompt = f"""
+Plan a data analysis for a presentation. The DataFrame is called 'df'.
+CSV Columns: {columns}
+Sample data (JSON dtypes and first rows):
+{sample_data}
+
+Question: {question}
+
+Return a JSON object with exactly these keys:
+- "pandas_query": Python pandas code that answers the question, using df as the DataFrame name.
+  Example: df.groupby('column').sum() or df[df['column'] > 100].mean()
+- "chart_type_slide3": chart for the primary finding, "bar" or "pie"
+- "chart_type_slide4": chart for the detailed analysis, "bar" or "pie"
+
+Chart Options (ONLY these two):
+- bar: comparing categories/groups, showing values across different items
+- pie: parts of whole, proportions (use only if <10 categories and shows proportions)
+"""
+    
+    try:
+        bundle = json.loads(ai(prompt, json_mode=True))
+    except Exception as e:
+        # Invalid JSON, including the API's own json_validate_failed error;
+        # analyze_data then falls back to a plain query request
+        print(f"Analysis planning failed: {e}")
+        bundle = {}
+    if not isinstance(bundle, dict):
+        bundle = {}
+    
+    # Keep only valid chart types; None lets the chart generator decide
+    chart_types = {}
+    for slide_no in (3, 4):
+        chart_type = str(bundle.get(f'chart_type_slide{slide_no}', '')).strip().lower()
+        chart_types[slide_no] = chart_type if chart_type in ('bar', 'pie') else None
+    
+    return {
+        'pandas_query': str(bundle.get('pandas_query') or ''),
+        'chart_types': chart_types
+    }
+
+# Markdown code fences the model may wrap around a query
+_MD_FENCE = re.compile(r'```.*?\n|```', re.DOTALL)
+
+# Side-effect free builtins that generated queries commonly rely on
+_SAFE_BUILTINS = {name: getattr(builtins, name)
+                  for name in ('abs', 'all', 'any', 'bool', 'callable', 'chr', 'dict', 'divmod',
+                               'enumerate', 'filter', 'float', 'format', 'frozenset', 'hash', 'int',
+                               'isinstance', 'issubclass', 'iter', 'len', 'list', 'map', 'max', 'min',
+                               'next', 'object', 'ord', 'pow', 'range', 'repr', 'reversed', 'round',
+                               'set', 'slice', 'sorted', 'str', 'sum', 'tuple', 'type', 'zip')}
+
+@lru_cache(maxsize=128)
+def _compile_query(query: str):
+    """Parse and compile a generated pandas expression once, rejecting dunder access"""
+    tree = ast.parse(query, mode='eval')
+    for node in ast.walk(tree):
+        name = node.attr if isinstance(node, ast.Attribute) else getattr(node, 'id', '')
+        if name.startswith('__'):
+            raise ValueError(f"Disallowed name in query: {name}")
+    return compile(tree, '<ai>', 'eval')
+
 def execute_pandas_query(df: pd.DataFrame, query: str) -> pd.DataFrame:
     """Execute pandas query on DataFrame"""
     try:
         # Clean the query - remove any markdown formatting
-        query = re.sub(r'```.*?\n|```', '', query).strip()
+        query = query.strip().removeprefix('```python\n').removesuffix('```')
+        if '```' in query:
+            query = _MD_FENCE.sub('', query)
+        query = query.strip()
         
-        # Execute the query
-        result = eval(query)
+        # Execute the query with only df, pd, np and pure builtins in scope; df is a
+        # global so lambdas and comprehensions inside the query can see it too
+        result = eval(_compile_query(query), {"df": df, "pd": pd, "np": np, "__builtins__": _SAFE_BUILTINS})
         
         # Convert to DataFrame if it's not already
         if not isinstance(result, pd.DataFrame):
@@ -46,11 +173,12 @@ def execute_pandas_query(df: pd.DataFrame, query: str) -> pd.DataFrame:
         print(f"Query execution error: {e}")
         return df.head(10)  # Return sample data as fallback
 
-def analyze_data(df: pd.DataFrame, question: str) -> dict:
-    """Analyze CSV data based on question"""
+def analyze_data(df: pd.DataFrame, question: str, charts: bool = True) -> dict:
+    """Analyze CSV data based on question; charts=False skips planning chart types"""
     
-    # Convert question to pandas query
-    pandas_query = convert_query_to_pandas(question, df)
+    # Plan query and chart types in one round-trip
+    bundle = analyze_bundle(df, question) if charts else {'pandas_query': '', 'chart_types': {}}
+    pandas_query = bundle['pandas_query'] or convert_query_to_pandas(question, df)
     print(f"Generated query: {pandas_query}")
     
     # Execute query
@@ -73,5 +201,73 @@ Provide a 2-3 sentence summary of what this data shows.
         'query': pandas_query,
         'result': result_df,
         'summary': summary,
-        'original_question': question
-    }
\ No newline at end of file
+        'original_question': question,
+        'chart_types': bundle['chart_types']
+    }
+
+def _file_fingerprint(filepath: str) -> str:
+    """Digest of a file's content; very large files hash size + mtime + first/last 64KB"""
+    digest = hashlib.blake2b(digest_size=16)
+    stat = os.stat(filepath)
+    with open(filepath, 'rb') as f:
+        if stat.st_size <= FULL_HASH_LIMIT_BYTES:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        else:
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+            digest.update(f.read(EDGE_HASH_BYTES))
+            f.seek(max(stat.st_size - EDGE_HASH_BYTES, 0))
+            digest.update(f.read(EDGE_HASH_BYTES))
+    return digest.hexdigest()
+
+def clear_analysis_cache():
+    """Delete every stored analyze_csv result"""
+    for path in glob.glob(os.path.join(ANALYSIS_CACHE_DIR, "*.json")):
+        os.remove(path)
+
+def _read_analysis_cache(cache_path: str):
+    """Stored AI output for an analysis, or None when missing, expired or unreadable"""
+    try:
+        if AI_CACHE_TTL and time.time() - os.path.getmtime(cache_path) >= AI_CACHE_TTL:
+            return None
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        return {
+            'query': str(cached['query']),
+            'summary': str(cached['summary']),
+            'chart_types': {int(slide_no): chart_type for slide_no, chart_type in cached['chart_types'].items()}
+        }
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Ignoring unreadable analysis cache {cache_path}: {e}")
+        return None
+
+def analyze_csv(filepath: str, question: str, nrows: int = None, charts: bool = True) -> dict:
+    """
+    Load and analyze a CSV, reusing the stored AI output (query, summary, chart types)
+    when file and question are unchanged. Only JSON is stored; the query is re-run locally.
+    """
+    question_key = hashlib.blake2b(f"{nrows}\0{charts}\0{question}".encode(), digest_size=16).hexdigest()
+    cache_path = os.path.join(ANALYSIS_CACHE_DIR, f"{_file_fingerprint(filepath)}_{question_key}.json")
+    df = load_csv(filepath, nrows=nrows)
+    
+    cached = _read_analysis_cache(cache_path)
+    if cached is not None:
+        return {
+            'query': cached['query'],
+            'result': execute_pandas_query(df, cached['query']),
+            'summary': cached['summary'],
+            'original_question': question,
+            'chart_types': cached['chart_types']
+        }
+    
+    analysis_result = analyze_data(df, question, charts=charts)
+    
+    # Write atomically so an interrupted run never leaves a truncated file
+    os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=ANALYSIS_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({key: analysis_result[key] for key in ('query', 'summary', 'chart_types')}, f)
+    os.replace(tmp_path, cache_path)
+    return analysis_result
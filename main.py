@@ -1,7 +1,7 @@
 import argparse
 import os
 from datetime import datetime
-from csv_processor import load_csv, analyze_data
+from csv_processor import load_csv, analyze_data, analyze_csv
 from ppt_generator import create_ppt_skeleton, create_presentation, get_available_templates
 
 # NEW: import chatbot utilities
@@ -97,10 +97,12 @@ def run_chatbot(csv_filepath: str):
         csv_filepath (str): Path to the CSV file
     """
     try:
-        df = load_csv(csv_filepath)
-        # Create a concise dataset summary for stable context
-        analysis_result = analyze_data(
-            df, "Please provide a concise factual summary of the dataset."
+        # Create a concise dataset summary for stable context; a summary only
+        # needs a bounded sample of large files, and is reused while the CSV is unchanged.
+        # The chatbot draws no charts, so chart planning is skipped
+        analysis_result = analyze_csv(
+            csv_filepath, "Please provide a concise factual summary of the dataset.", nrows=10000,
+            charts=False
         )
         summary = analysis_result.get("summary", "")
         # Start interactive chatbot loop
@@ -8,14 +8,85 @@ def ai(prompt: str, model: str = "llama3") -> str:
     )
     return result.stdout.strip()"""
 
+import functools
+import glob
+import hashlib
+import os
+import tempfile
+import time
 from groq import Groq
 
 client = Groq(api_key=GROQ_API_KEY)
 
-def ai(prompt: str, model: str = "llama-3.1-8b-instant") -> str:
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+# On-disk cache for LLM responses, shared across runs
+AI_CACHE_DIR = os.path.join(".cache", "ai")
+# Seconds a stored response stays valid; unset or 0 keeps responses until cleared
+AI_CACHE_TTL = float(os.environ.get("AI_CACHE_TTL") or 0)
+
+def _cache_path(model: str, prompt: str, json_mode: bool = False, system: str = None) -> str:
+    """Content-addressed cache file for a (model, system, prompt) combination"""
+    if json_mode:
+        model += ":json"
+    if system:
+        prompt = system + "\0" + prompt
+    key = hashlib.blake2b((model + "\0" + prompt).encode(), digest_size=16).hexdigest()
+    return os.path.join(AI_CACHE_DIR, f"{key}.txt")
+
+def cached_ai(func):
+    """Memoize an LLM call in memory and on disk, keyed by (model, system, prompt)"""
+
+    def load(prompt: str, model: str, json_mode: bool, system: str) -> str:
+        path = _cache_path(model, prompt, json_mode, system)
+        try:
+            if not AI_CACHE_TTL or time.time() - os.path.getmtime(path) < AI_CACHE_TTL:
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        except FileNotFoundError:
+            pass
+
+        result = func(prompt, model, json_mode, system)
+
+        # Write atomically so concurrent runs never see a partial file
+        os.makedirs(AI_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=AI_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(result)
+        os.replace(tmp_path, path)
+        return result
+
+    cached = functools.lru_cache(maxsize=512)(load)
+
+    @functools.wraps(func)
+    def wrapper(prompt: str, model: str = DEFAULT_MODEL, json_mode: bool = False, system: str = None) -> str:
+        # In-memory entries never expire, so with a TTL only the on-disk cache is used
+        if AI_CACHE_TTL:
+            return load(prompt, model, json_mode, system)
+        return cached(prompt, model, json_mode, system)
+
+    def cache_clear():
+        """Drop both the in-memory and the on-disk cache"""
+        cached.cache_clear()
+        for path in glob.glob(os.path.join(AI_CACHE_DIR, "*.txt")):
+            os.remove(path)
+
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+@cached_ai
+def ai(prompt: str, model: str = DEFAULT_MODEL, json_mode: bool = False, system: str = None) -> str:
+    """
+    Send a prompt to Groq. With json_mode the reply is guaranteed to be a JSON object.
+    An optional system message goes first, so calls sharing it share a prompt prefix.
+    """
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
     response = client.chat.completions.create(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages,
+        **extra,
     )
     return response.choices[0].message.content.strip()
-
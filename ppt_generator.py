@@ -4,10 +4,87 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.enum.dml import MSO_THEME_COLOR
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from lxml import etree
+from xml.sax.saxutils import escape
+import glob
+import io
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
 from model import ai
-from chart_generator import generate_chart, create_chart_directory
+from chart_generator import generate_charts, dpi_for_width
+
+# Prefer the C-backed orjson parser for AI responses when it is installed
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# JSON object wrapped in a markdown code fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+
+# One generated point per line: skips the bullet markers and numbering the model
+# puts in front, trims trailing whitespace, and only matches 11+ character points
+_BULLET_LINE_RE = re.compile(
+    r'^(?:[•\-*►▪▫◦‣\d+.]|[^\S\n])*([^•\-*►▪▫◦‣\d+.\s][^\n]{9,}\S)[^\S\n]*$', re.MULTILINE
+)
+
+# Contrasting text colors (RGBColor is immutable, so these are shared)
+_WHITE = RGBColor(255, 255, 255)
+_DARK_GRAY = RGBColor(51, 51, 51)
+
+# Upper bound on concurrent AI calls while enhancing slide content
+MAX_AI_WORKERS = 8
+
+# Screen density charts are rasterized for (2x a 96 dpi display, so high-DPI screens stay sharp)
+CHART_DISPLAY_DPI = 192
+
+# Write slide text as prebuilt DrawingML instead of one python-pptx setter per
+# property; set to False if a template's placeholders need the setter path
+FAST_TEXT_XML = True
+
+@dataclass(frozen=True, slots=True)
+class _Box:
+    """Resolved position (EMU) and transparency of one slide element"""
+    left: int
+    top: int
+    width: int
+    height: int
+    transparency: int
+
+@dataclass(frozen=True, slots=True)
+class _TextStyle(_Box):
+    """Resolved position and font styling of a text element"""
+    font_size: Pt
+    bold: bool
+    color: RGBColor
+    alignment: PP_ALIGN
+    margin_left: int = 0
+    margin_right: int = 0
+    bullet_spacing: Pt = None
+
+@dataclass(frozen=True, slots=True)
+class _TitleSlide:
+    title: _TextStyle
+    subtitle: _TextStyle
+
+@dataclass(frozen=True, slots=True)
+class _ContentSlide:
+    title: _TextStyle
+    content: _TextStyle
+
+@dataclass(frozen=True, slots=True)
+class _ChartSlide:
+    title: _TextStyle
+    chart: _Box
+    text: _TextStyle
 
 # =====================================================
 # SLIDE POSITIONING & STYLING CONFIGURATION
@@ -117,6 +194,102 @@ class SlideConfig:
         'color_rgb': (255, 255, 255),    # White background
         'transparency': 0                # 0-100%
     }
+    
+    @classmethod
+    def _element(cls, element):
+        """Resolve one element's percentage settings into a _Box or _TextStyle"""
+        box = dict(
+            left=Inches(element['left_percent'] / 100 * cls.SLIDE_WIDTH),
+            top=Inches(element['top_percent'] / 100 * cls.SLIDE_HEIGHT),
+            width=Inches(element['width_percent'] / 100 * cls.SLIDE_WIDTH),
+            height=Inches(element['height_percent'] / 100 * cls.SLIDE_HEIGHT),
+            transparency=element['transparency'],
+        )
+        if 'font_size' not in element:
+            return _Box(**box)
+        return _TextStyle(
+            **box,
+            font_size=Pt(element['font_size']),
+            bold=element['font_bold'],
+            color=RGBColor(*element['color_rgb']),
+            alignment=element['alignment'],
+            margin_left=Inches(element.get('margin_left_percent', 0) / 100 * cls.SLIDE_WIDTH),
+            margin_right=Inches(element.get('margin_right_percent', 0) / 100 * cls.SLIDE_WIDTH),
+            bullet_spacing=Pt(element['bullet_spacing']) if 'bullet_spacing' in element else None,
+        )
+    
+    @classmethod
+    def _precompute(cls):
+        """
+        Resolve the percentage settings above into ready-to-use python-pptx values
+        (EMU positions, Pt sizes, RGBColor) exposed as TITLE, CONTENT and CHART.
+        Runs once on import; call again after editing the percentages at runtime.
+        """
+        cls.TITLE = _TitleSlide(**{name: cls._element(e) for name, e in cls.TITLE_SLIDE.items()})
+        cls.CONTENT = _ContentSlide(**{name: cls._element(e) for name, e in cls.CONTENT_SLIDE.items()})
+        cls.CHART = _ChartSlide(**{name: cls._element(e) for name, e in cls.CHART_SLIDE.items()})
+
+SlideConfig._precompute()
+
+def _apply_font(paragraph, config):
+    """Apply size, colour, weight and alignment from a _TextStyle to a paragraph"""
+    font = paragraph.font
+    font.size = config.font_size
+    font.color.rgb = config.color
+    font.bold = config.bold
+    paragraph.alignment = config.alignment
+
+# DrawingML values for the alignments used in SlideConfig
+_ALIGN_XML = {PP_ALIGN.LEFT: 'l', PP_ALIGN.CENTER: 'ctr', PP_ALIGN.RIGHT: 'r', PP_ALIGN.JUSTIFY: 'just'}
+
+def _paragraph_xml(text, config, space_after=None):
+    """
+    <a:p> markup equivalent to setting paragraph.text and calling _apply_font,
+    plus space_after when given
+    """
+    align = _ALIGN_XML.get(config.alignment)
+    align = f' algn="{align}"' if align else ''
+    spacing = f'<a:spcAft><a:spcPts val="{space_after.centipoints}"/></a:spcAft>' if space_after is not None else ''
+    run = f'<a:r><a:t>{escape(text)}</a:t></a:r>' if text else ''
+    return (
+        f'<a:p><a:pPr{align}>{spacing}'
+        f'<a:defRPr sz="{config.font_size.centipoints}" b="{1 if config.bold else 0}">'
+        f'<a:solidFill><a:srgbClr val="{config.color}"/></a:solidFill></a:defRPr></a:pPr>{run}</a:p>'
+    )
+
+# Text the setters rewrite: "\n" becomes extra paragraphs or <a:br/>, "\r" is escaped as _x000D_
+_SETTER_ONLY_RE = re.compile(r'[\r\n]')
+
+def _bullets_xml(bullet_points, config):
+    """
+    All bullet paragraphs as one XML string, or None when a bullet contains a
+    line break or carriage return that only the setters handle
+    """
+    lines = [f"• {bullet}" for bullet in bullet_points]
+    if any(_SETTER_ONLY_RE.search(line) for line in lines):
+        return None
+    return "".join(_paragraph_xml(line, config, config.bullet_spacing) for line in lines)
+
+def _textbox_xml(config, paragraphs_xml, body_attrs):
+    """<p:sp> text box as add_textbox creates it; id and name are assigned by _append_shape"""
+    return (
+        f'<p:sp {nsdecls("a", "p")}>'
+        '<p:nvSpPr><p:cNvPr id="0" name=""/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+        f'<p:spPr><a:xfrm><a:off x="{config.left}" y="{config.top}"/>'
+        f'<a:ext cx="{config.width}" cy="{config.height}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+        f'<p:txBody><a:bodyPr {body_attrs}><a:spAutoFit/></a:bodyPr><a:lstStyle/>{paragraphs_xml}</p:txBody>'
+        '</p:sp>'
+    )
+
+def _append_shape(slide, sp):
+    """Add a prebuilt <p:sp> to the slide with the next free shape id and return the shape"""
+    shapes = slide.shapes
+    shape_id = shapes._next_shape_id
+    sp.nvSpPr.cNvPr.id = shape_id
+    sp.nvSpPr.cNvPr.name = f"TextBox {shape_id - 1}"
+    shapes._spTree.insert_element_before(sp, 'p:extLst')
+    return shapes._shape_factory(sp)
 
 class PPTTemplate:
     """Base class for PowerPoint templates with configurable positioning"""
@@ -124,197 +297,235 @@ class PPTTemplate:
     def __init__(self):
         self.name = "Default"
         self.config = SlideConfig()
+        # Inches per percent of each slide dimension
+        self._width_scale = self.config.SLIDE_WIDTH * 0.01
+        self._height_scale = self.config.SLIDE_HEIGHT * 0.01
+        self._dim = {'width': self._width_scale, 'height': self._height_scale}
+        
+    def percent_to_width(self, percent_value):
+        """Convert a percentage of the slide width to inches"""
+        return Inches(percent_value * self._width_scale)
+    
+    def percent_to_height(self, percent_value):
+        """Convert a percentage of the slide height to inches"""
+        return Inches(percent_value * self._height_scale)
         
     def percent_to_inches(self, percent_value, dimension_type='width'):
         """Convert percentage to inches based on slide dimensions"""
-        if dimension_type == 'width':
-            return Inches((percent_value / 100) * self.config.SLIDE_WIDTH)
-        else:  # height
-            return Inches((percent_value / 100) * self.config.SLIDE_HEIGHT)
+        return Inches(percent_value * self._dim.get(dimension_type, self._height_scale))
     
     def apply_transparency(self, shape, transparency_percent):
-        """Apply transparency to shape (0-100%)"""
-        if hasattr(shape, 'fill'):
-            shape.fill.transparency = transparency_percent / 100
+        """Apply transparency to shape (0-100%); 0 is the default and needs no work"""
+        if transparency_percent:
+            try:
+                shape.fill.transparency = transparency_percent * 0.01
+            except AttributeError:
+                pass  # Shapes without a fill, e.g. pictures
     
     def apply_title_slide_styling(self, slide, title_text, subtitle_text):
         """Apply styling to title slide with configurable positioning"""
-        title_config = self.config.TITLE_SLIDE['title']
-        subtitle_config = self.config.TITLE_SLIDE['subtitle']
+        title_config = self.config.TITLE.title
+        subtitle_config = self.config.TITLE.subtitle
         
         # Title
         if slide.shapes.title:
             title = slide.shapes.title
             # Position
-            title.left = self.percent_to_inches(title_config['left_percent'], 'width')
-            title.top = self.percent_to_inches(title_config['top_percent'], 'height')
-            title.width = self.percent_to_inches(title_config['width_percent'], 'width')
-            title.height = self.percent_to_inches(title_config['height_percent'], 'height')
+            title.left = title_config.left
+            title.top = title_config.top
+            title.width = title_config.width
+            title.height = title_config.height
             
             # Text styling
             title.text = title_text
-            title.text_frame.paragraphs[0].font.size = Pt(title_config['font_size'])
-            title.text_frame.paragraphs[0].font.color.rgb = RGBColor(*title_config['color_rgb'])
-            title.text_frame.paragraphs[0].font.bold = title_config['font_bold']
-            title.text_frame.paragraphs[0].alignment = title_config['alignment']
+            _apply_font(title.text_frame.paragraphs[0], title_config)
             
             # Transparency
-            self.apply_transparency(title, title_config['transparency'])
+            self.apply_transparency(title, title_config.transparency)
         
         # Subtitle
         if len(slide.placeholders) > 1:
             subtitle = slide.placeholders[1]
             # Position
-            subtitle.left = self.percent_to_inches(subtitle_config['left_percent'], 'width')
-            subtitle.top = self.percent_to_inches(subtitle_config['top_percent'], 'height')
-            subtitle.width = self.percent_to_inches(subtitle_config['width_percent'], 'width')
-            subtitle.height = self.percent_to_inches(subtitle_config['height_percent'], 'height')
+            subtitle.left = subtitle_config.left
+            subtitle.top = subtitle_config.top
+            subtitle.width = subtitle_config.width
+            subtitle.height = subtitle_config.height
             
             # Text styling
             subtitle.text = subtitle_text
-            subtitle.text_frame.paragraphs[0].font.size = Pt(subtitle_config['font_size'])
-            subtitle.text_frame.paragraphs[0].font.color.rgb = RGBColor(*subtitle_config['color_rgb'])
-            subtitle.text_frame.paragraphs[0].font.bold = subtitle_config['font_bold']
-            subtitle.text_frame.paragraphs[0].alignment = subtitle_config['alignment']
+            _apply_font(subtitle.text_frame.paragraphs[0], subtitle_config)
             
             # Transparency
-            self.apply_transparency(subtitle, subtitle_config['transparency'])
+            self.apply_transparency(subtitle, subtitle_config.transparency)
     
     def apply_content_slide_styling(self, slide, title_text, content_list):
         """Apply styling to content slide with configurable positioning"""
-        title_config = self.config.CONTENT_SLIDE['title']
-        content_config = self.config.CONTENT_SLIDE['content']
+        title_config = self.config.CONTENT.title
+        content_config = self.config.CONTENT.content
         
         # Title
         if slide.shapes.title:
             title = slide.shapes.title
             # Position
-            title.left = self.percent_to_inches(title_config['left_percent'], 'width')
-            title.top = self.percent_to_inches(title_config['top_percent'], 'height')
-            title.width = self.percent_to_inches(title_config['width_percent'], 'width')
-            title.height = self.percent_to_inches(title_config['height_percent'], 'height')
+            title.left = title_config.left
+            title.top = title_config.top
+            title.width = title_config.width
+            title.height = title_config.height
             
             # Text styling
             title.text = title_text
-            title.text_frame.paragraphs[0].font.size = Pt(title_config['font_size'])
-            title.text_frame.paragraphs[0].font.bold = title_config['font_bold']
-            title.text_frame.paragraphs[0].alignment = title_config['alignment']
-            title.text_frame.paragraphs[0].font.color.rgb = RGBColor(*title_config['color_rgb'])
+            _apply_font(title.text_frame.paragraphs[0], title_config)
             
             # Transparency
-            self.apply_transparency(title, title_config['transparency'])
+            self.apply_transparency(title, title_config.transparency)
         
         # Content
         if len(slide.placeholders) > 1:
             content_placeholder = slide.placeholders[1]
             # Position
-            content_placeholder.left = self.percent_to_inches(content_config['left_percent'], 'width')
-            content_placeholder.top = self.percent_to_inches(content_config['top_percent'], 'height')
-            content_placeholder.width = self.percent_to_inches(content_config['width_percent'], 'width')
-            content_placeholder.height = self.percent_to_inches(content_config['height_percent'], 'height')
+            content_placeholder.left = content_config.left
+            content_placeholder.top = content_config.top
+            content_placeholder.width = content_config.width
+            content_placeholder.height = content_config.height
             
             content_frame = content_placeholder.text_frame
             content_frame.word_wrap = True
             
             # Margins
-            content_frame.margin_left = self.percent_to_inches(content_config['margin_left_percent'], 'width')
-            content_frame.margin_right = self.percent_to_inches(content_config['margin_right_percent'], 'width')
+            content_frame.margin_left = content_config.margin_left
+            content_frame.margin_right = content_config.margin_right
             
-            # Content bullets
-            if content_list:
+            # Content bullets, inserted in one step when they can be prebuilt
+            paragraphs = _bullets_xml(content_list, content_config) if FAST_TEXT_XML and content_list else None
+            if paragraphs is not None:
+                try:
+                    paragraphs = parse_xml(f'<a:txBody {nsdecls("a")}>{paragraphs}</a:txBody>')
+                except etree.XMLSyntaxError:
+                    paragraphs = None
+            if paragraphs is not None:
+                txBody = content_frame._txBody
+                txBody.clear_content()
+                txBody.extend(list(paragraphs))
+            elif content_list:
+                bullet_spacing = content_config.bullet_spacing
                 for i, bullet in enumerate(content_list):
                     if i == 0:
                         content_frame.text = f"• {bullet}"
+                        paragraph = content_frame.paragraphs[0]
                     else:
-                        p = content_frame.add_paragraph()
-                        p.text = f"• {bullet}"
+                        paragraph = content_frame.add_paragraph()
+                        paragraph.text = f"• {bullet}"
                     
-                    paragraph = content_frame.paragraphs[i]
-                    paragraph.font.size = Pt(content_config['font_size'])
-                    paragraph.font.color.rgb = RGBColor(*content_config['color_rgb'])
-                    paragraph.space_after = Pt(content_config['bullet_spacing'])
-                    paragraph.alignment = content_config['alignment']
+                    _apply_font(paragraph, content_config)
+                    paragraph.space_after = bullet_spacing
             
             # Transparency
-            self.apply_transparency(content_placeholder, content_config['transparency'])
-    
-    def create_chart_slide(self, prs, title_text, chart_path, bullet_points):
-        """Create a chart slide with configurable positioning"""
-        title_config = self.config.CHART_SLIDE['title']
-        chart_config = self.config.CHART_SLIDE['chart']
-        text_config = self.config.CHART_SLIDE['text']
+            self.apply_transparency(content_placeholder, content_config.transparency)
+    
+    def _chart_slide_textboxes(self, title_text, bullet_points):
+        """
+        Build the chart slide's title and bullet text boxes as ready-made XML, which
+        skips python-pptx's per-property setters. Returns (None, None) when the text
+        needs the setters instead: line breaks, carriage returns, or characters lxml refuses to parse.
+        """
+        title_config = self.config.CHART.title
+        text_config = self.config.CHART.text
+        paragraphs = _bullets_xml(bullet_points or [], text_config)
+        if not FAST_TEXT_XML or paragraphs is None or _SETTER_ONLY_RE.search(title_text):
+            return None, None
+        paragraphs = paragraphs or "<a:p/>"
+        try:
+            title_sp = parse_xml(_textbox_xml(
+                title_config, _paragraph_xml(title_text, title_config), 'wrap="none"'
+            ))
+            text_sp = parse_xml(_textbox_xml(
+                text_config, paragraphs,
+                f'wrap="square" lIns="{text_config.margin_left}" rIns="{text_config.margin_right}"'
+            ))
+        except etree.XMLSyntaxError:
+            return None, None
+        return title_sp, text_sp
+    
+    def create_chart_slide(self, prs, title_text, chart_image, bullet_points, layout=None):
+        """
+        Create a chart slide with configurable positioning; chart_image is a path or an image buffer.
+        layout defaults to prs.slide_layouts[5]; pass it in when adding many slides.
+        """
+        title_config = self.config.CHART.title
+        chart_config = self.config.CHART.chart
+        text_config = self.config.CHART.text
         
-        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide = prs.slides.add_slide(layout if layout is not None else prs.slide_layouts[5])
+        title_sp, text_sp = self._chart_slide_textboxes(title_text, bullet_points)
         
         # Title
-        title_box = slide.shapes.add_textbox(
-            self.percent_to_inches(title_config['left_percent'], 'width'),
-            self.percent_to_inches(title_config['top_percent'], 'height'),
-            self.percent_to_inches(title_config['width_percent'], 'width'),
-            self.percent_to_inches(title_config['height_percent'], 'height')
-        )
-        title_frame = title_box.text_frame
-        title_frame.text = title_text
-        title_frame.paragraphs[0].font.size = Pt(title_config['font_size'])
-        title_frame.paragraphs[0].font.bold = title_config['font_bold']
-        title_frame.paragraphs[0].font.color.rgb = RGBColor(*title_config['color_rgb'])
-        title_frame.paragraphs[0].alignment = title_config['alignment']
+        if title_sp is not None:
+            title_box = _append_shape(slide, title_sp)
+        else:
+            title_box = slide.shapes.add_textbox(
+                title_config.left,
+                title_config.top,
+                title_config.width,
+                title_config.height
+            )
+            title_frame = title_box.text_frame
+            title_frame.text = title_text
+            _apply_font(title_frame.paragraphs[0], title_config)
         
         # Transparency
-        self.apply_transparency(title_box, title_config['transparency'])
+        self.apply_transparency(title_box, title_config.transparency)
         
         # Chart
-        if os.path.exists(chart_path):
+        if chart_image is not None and (not isinstance(chart_image, str) or os.path.exists(chart_image)):
             chart_shape = slide.shapes.add_picture(
-                chart_path,
-                self.percent_to_inches(chart_config['left_percent'], 'width'),
-                self.percent_to_inches(chart_config['top_percent'], 'height'),
-                width=self.percent_to_inches(chart_config['width_percent'], 'width'),
-                height=self.percent_to_inches(chart_config['height_percent'], 'height')
+                chart_image,
+                chart_config.left,
+                chart_config.top,
+                width=chart_config.width,
+                height=chart_config.height
             )
             # Transparency
-            self.apply_transparency(chart_shape, chart_config['transparency'])
+            self.apply_transparency(chart_shape, chart_config.transparency)
         
         # Bullet points text box
-        text_box = slide.shapes.add_textbox(
-            self.percent_to_inches(text_config['left_percent'], 'width'),
-            self.percent_to_inches(text_config['top_percent'], 'height'),
-            self.percent_to_inches(text_config['width_percent'], 'width'),
-            self.percent_to_inches(text_config['height_percent'], 'height')
-        )
-        text_frame = text_box.text_frame
-        text_frame.margin_left = self.percent_to_inches(text_config['margin_left_percent'], 'width')
-        text_frame.margin_right = self.percent_to_inches(text_config['margin_right_percent'], 'width')
-        text_frame.word_wrap = True
-        
-        if bullet_points:
-            for i, bullet in enumerate(bullet_points):
-                if i == 0:
-                    text_frame.text = f"• {bullet}"
-                else:
-                    p = text_frame.add_paragraph()
-                    p.text = f"• {bullet}"
-                
-                paragraph = text_frame.paragraphs[i]
-                paragraph.font.size = Pt(text_config['font_size'])
-                paragraph.font.color.rgb = RGBColor(*text_config['color_rgb'])
-                paragraph.space_after = Pt(text_config['bullet_spacing'])
-                paragraph.alignment = text_config['alignment']
+        if text_sp is not None:
+            text_box = _append_shape(slide, text_sp)
+        else:
+            text_box = slide.shapes.add_textbox(
+                text_config.left,
+                text_config.top,
+                text_config.width,
+                text_config.height
+            )
+            text_frame = text_box.text_frame
+            text_frame.margin_left = text_config.margin_left
+            text_frame.margin_right = text_config.margin_right
+            text_frame.word_wrap = True
+            
+            if bullet_points:
+                bullet_spacing = text_config.bullet_spacing
+                for i, bullet in enumerate(bullet_points):
+                    if i == 0:
+                        text_frame.text = f"• {bullet}"
+                        paragraph = text_frame.paragraphs[0]
+                    else:
+                        paragraph = text_frame.add_paragraph()
+                        paragraph.text = f"• {bullet}"
+                    
+                    _apply_font(paragraph, text_config)
+                    paragraph.space_after = bullet_spacing
         
         # Transparency
-        self.apply_transparency(text_box, text_config['transparency'])
+        self.apply_transparency(text_box, text_config.transparency)
         
         return slide
     
     def get_contrasting_text_color(self, background_color):
         """Calculate contrasting text color based on background brightness"""
         r, g, b = background_color.r, background_color.g, background_color.b
-        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-        
-        if luminance < 0.5:
-            return RGBColor(255, 255, 255)  # White
-        else:
-            return RGBColor(51, 51, 51)     # Dark gray
+        # Integer form of (0.299r + 0.587g + 0.114b) / 255 < 0.5
+        return _WHITE if (r * 299 + g * 587 + b * 114) < 127500 else _DARK_GRAY
 
 def get_available_templates():
     """Updated to scan POTX files instead of hardcoded templates"""
@@ -347,120 +558,154 @@ Return ONLY this JSON structure:
     
     response = ai(prompt).strip()
     
-    # Enhanced JSON extraction
-    if '```' in response:
-        response = response.split('```')[1].strip()
-        if response.startswith('json'):
-            response = response[4:].strip()
+    # Fast path: the model returned a bare JSON object; anything else goes through extraction
+    try:
+        skeleton = _loads(response)
+        if isinstance(skeleton, dict):
+            return skeleton
+    except ValueError:
+        pass
     
-    start = response.find('{')
-    end = response.rfind('}') + 1
-    if start != -1 and end > start:
-        response = response[start:end]
+    # Enhanced JSON extraction
+    fenced = _FENCE_RE.search(response)
+    if fenced:
+        response = fenced.group(1)
+    else:
+        start = response.find('{')
+        end = response.rfind('}') + 1
+        if start != -1 and end > start:
+            response = response[start:end]
     
     try:
-        return json.loads(response)
+        skeleton = _loads(response)
     except:
-        # Better fallback with specific titles
-        return {
-            "slides": [
-                {"slide_no": 1, "title": f"Executive Summary: {analysis_result['original_question'][:35]}", "type": "title", "content": ["Key insights and findings from comprehensive data analysis"]},
-                {"slide_no": 2, "title": "Data Overview & Analysis Approach", "type": "content", "content": ["Dataset scope and key characteristics", "Analytical methodology and tools applied", "Data quality assessment and validation"]},
-                {"slide_no": 3, "title": "Primary Data Insights", "type": "chart", "content": ["Most significant patterns discovered in data", "Critical trends affecting business outcomes", "Key performance indicators and metrics"]},
-                {"slide_no": 4, "title": "Detailed Analysis Results", "type": "chart", "content": ["In-depth examination of key variables", "Correlation and causation relationships found", "Predictive insights and future implications"]},
-                {"slide_no": 5, "title": "Strategic Recommendations", "type": "content", "content": ["Primary business recommendations based on data", "Immediate action items for implementation", "Long-term strategic opportunities identified"]}
-            ]
-        }
+        skeleton = None
+    if isinstance(skeleton, dict):
+        return skeleton
+    
+    # Better fallback with specific titles
+    return {
+        "slides": [
+            {"slide_no": 1, "title": f"Executive Summary: {analysis_result['original_question'][:35]}", "type": "title", "content": ["Key insights and findings from comprehensive data analysis"]},
+            {"slide_no": 2, "title": "Data Overview & Analysis Approach", "type": "content", "content": ["Dataset scope and key characteristics", "Analytical methodology and tools applied", "Data quality assessment and validation"]},
+            {"slide_no": 3, "title": "Primary Data Insights", "type": "chart", "content": ["Most significant patterns discovered in data", "Critical trends affecting business outcomes", "Key performance indicators and metrics"]},
+            {"slide_no": 4, "title": "Detailed Analysis Results", "type": "chart", "content": ["In-depth examination of key variables", "Correlation and causation relationships found", "Predictive insights and future implications"]},
+            {"slide_no": 5, "title": "Strategic Recommendations", "type": "content", "content": ["Primary business recommendations based on data", "Immediate action items for implementation", "Long-term strategic opportunities identified"]}
+        ]
+    }
+
+# Static instructions for enhance_slide_content
+_ENHANCE_RULES = """Transform outline points into compelling presentation content.
+
+Requirements:
+- Each bullet point: 12-20 words maximum
+- Use active voice and strong action verbs
+- Include specific data insights where relevant
+- Make it business-focused and actionable
+- No generic statements"""
 
 def enhance_slide_content(slide: dict, analysis_result: dict) -> dict:
     """Enhanced content generation with better AI prompting"""
     outline_points = slide.get('content', [])
     
-    prompt = f"""Transform these outline points into compelling presentation content:
-
-Slide Title: {slide['title']}
-Current Outline: {outline_points}
+    # Deck-wide context goes in the system message, identical for every slide
+    system = f"""{_ENHANCE_RULES}
 
 Context:
 - Question: {analysis_result['original_question']}
-- Summary: {analysis_result['summary'][:300]}
-- Slide Type: {slide['type']}
-
-Requirements:
-- Each bullet point: 12-20 words maximum
-- Use active voice and strong action verbs
-- Include specific data insights where relevant
-- Make it business-focused and actionable
-- No generic statements
+- Summary: {analysis_result['summary'][:300]}"""
+    
+    prompt = f"""Slide Title: {slide['title']}
+Current Outline: {outline_points}
+Slide Type: {slide['type']}
 
 Return exactly {len(outline_points)} enhanced bullet points, one per line, no extra formatting."""
     
-    response = ai(prompt).strip()
-    lines = response.split('\n')
+    response = ai(prompt, system=system).strip()
     
-    enhanced_points = []
-    for line in lines:
-        line = line.strip()
-        # Clean formatting
-        import re
-        line = re.sub(r'^[•\-*►▪▫◦‣\d+\.\s]+', '', line).strip()
-        if line and len(line) > 10:
-            enhanced_points.append(line)
+    # Strip bullet/numbering prefixes and drop fragments
+    enhanced_points = _BULLET_LINE_RE.findall(response)
     
     # Ensure we have content
     slide['content'] = enhanced_points[:4] if enhanced_points else outline_points[:4]
     return slide
 
-def create_presentation(skeleton: dict, analysis_result: dict, output_filename: str, template_name: str = "default") -> str:
-    """Updated to use POTX templates and enhanced charts with configurable positioning"""
+def create_presentation(skeleton: dict, analysis_result: dict, output_filename: str, template_name: str = "default",
+                        chart_dir: str = None) -> str:
+    """
+    Updated to use POTX templates and enhanced charts with configurable positioning.
+    Charts are rendered in memory; pass chart_dir to also keep the PNG files for debugging.
+    """
     
     # Load POTX template and create template instance
     prs = load_pptx_template(template_name)
     template = PPTTemplate()
-    chart_dir = create_chart_directory()
+    if chart_dir:
+        os.makedirs(chart_dir, exist_ok=True)
     
     print(f"Using template: {template_name}")
     
-    for slide_data in skeleton['slides']:
-        slide_data = enhance_slide_content(slide_data, analysis_result)
-        
+    # Charts depend only on the skeleton titles, so they can render while content is enhanced
+    chart_types = analysis_result.get('chart_types', {})
+    chart_jobs = [
+        (
+            analysis_result['result'],
+            f"{analysis_result['original_question']} - {slide_data['title']}",
+            os.path.join(chart_dir, f"chart_{slide_data['slide_no']}.png") if chart_dir else None,
+            chart_types.get(slide_data['slide_no'])
+        )
+        for slide_data in skeleton['slides'] if slide_data['type'] == 'chart'
+    ]
+    
+    # Every enhancement is an independent AI round-trip: run them concurrently.
+    # Slide assembly below stays single-threaded because python-pptx is not thread-safe.
+    # One extra worker drives the chart batch.
+    with ThreadPoolExecutor(max_workers=min(MAX_AI_WORKERS, len(skeleton['slides'])) + 1) as executor:
+        charts_future = executor.submit(generate_charts, chart_jobs,
+                                        dpi=dpi_for_width(template.config.CHART.chart.width.inches, CHART_DISPLAY_DPI))
+        slides = list(executor.map(lambda slide_data: enhance_slide_content(slide_data, analysis_result),
+                                   skeleton['slides']))
+        chart_images = iter(charts_future.result())
+    
+    # Resolve the layouts once rather than per slide
+    title_layout = prs.slide_layouts[0]
+    content_layout = prs.slide_layouts[1]
+    chart_layout = prs.slide_layouts[5]
+    add_slide = prs.slides.add_slide
+    
+    for slide_data in slides:
         if slide_data['type'] == 'title':
             # Title slide with configurable positioning
-            slide = prs.slides.add_slide(prs.slide_layouts[0])
+            slide = add_slide(title_layout)
             subtitle_text = '\n'.join(slide_data['content'])
             template.apply_title_slide_styling(slide, slide_data['title'], subtitle_text)
             
         elif slide_data['type'] == 'chart':
             # Enhanced chart slide with configurable positioning
-            chart_path = os.path.join(chart_dir, f"chart_{slide_data['slide_no']}.png")
-            generate_chart(
-                analysis_result['result'], 
-                f"{analysis_result['original_question']} - {slide_data['title']}", 
-                chart_path
-            )
-            
             slide = template.create_chart_slide(
                 prs, 
                 slide_data['title'], 
-                chart_path, 
-                slide_data['content']
+                next(chart_images), 
+                slide_data['content'],
+                layout=chart_layout
             )
             
         else:
             # Content slide with configurable positioning
-            slide = prs.slides.add_slide(prs.slide_layouts[1])
+            slide = add_slide(content_layout)
             template.apply_content_slide_styling(slide, slide_data['title'], slide_data['content'])
     
     prs.save(output_filename)
     print(f"Enhanced presentation created with {template_name} template")
     return output_filename
     
-def scan_pptx_templates(templates_folder="templates"):
-    """Scan for available PPTX template files in templates folder"""
-    import glob
-    from pathlib import Path
-    
+def _ensure_templates_dir(templates_folder):
+    """Create the templates folder if missing (never cached)"""
     os.makedirs(templates_folder, exist_ok=True)
+
+@lru_cache(maxsize=8)
+def _scan_cached(templates_folder):
+    """Glob the templates folder once per session; see refresh_templates()"""
     template_files = {}
     
     # Look for .pptx files instead of .potx
@@ -474,7 +719,35 @@ def scan_pptx_templates(templates_folder="templates"):
     if not template_files:
         template_files["default"] = None
         
-    return template_files
+    return tuple(template_files.items())
+
+def scan_pptx_templates(templates_folder="templates"):
+    """Scan for available PPTX template files in templates folder"""
+    _ensure_templates_dir(templates_folder)
+    # Fresh dict so callers may mutate it without touching the cache
+    return dict(_scan_cached(templates_folder))
+
+def refresh_templates():
+    """Forget cached template scans and file contents, e.g. after adding or editing templates"""
+    _scan_cached.cache_clear()
+    _load_template.cache_clear()
+
+@lru_cache(maxsize=8)
+def _load_template(template_path):
+    """Read a template file once; callers wrap the bytes in a fresh Presentation"""
+    with open(template_path, 'rb') as f:
+        return f.read()
+
+@lru_cache(maxsize=1)
+def _blank_template():
+    """python-pptx's built-in default deck, read from its package once and kept as bytes"""
+    buffer = io.BytesIO()
+    Presentation().save(buffer)
+    return buffer.getvalue()
+
+def _blank_presentation():
+    """Fresh blank presentation from the cached default template"""
+    return Presentation(io.BytesIO(_blank_template()))
 
 def load_pptx_template(template_name="default", templates_folder="templates"):
     """Load PPTX template or create default presentation"""
@@ -484,19 +757,22 @@ def load_pptx_template(template_name="default", templates_folder="templates"):
     if template_name in available_templates and available_templates[template_name]:
         try:
             # Load existing .pptx as template
-            prs = Presentation(available_templates[template_name])
+            prs = Presentation(io.BytesIO(_load_template(available_templates[template_name])))
             # Clear existing slides to use as clean template
-            slide_count = len(prs.slides)
-            for i in range(slide_count - 1, -1, -1):
-                slide_xml = prs.slides._sldIdLst[i]
-                prs.part.drop_rel(slide_xml.rId)
-                del prs.slides._sldIdLst[i]
+            sldIdLst = prs.slides._sldIdLst
+            rIds = [sldId.rId for sldId in sldIdLst]
+            if not rIds:
+                return prs
+            for rId in rIds:
+                prs.part.drop_rel(rId)
+            for sldId in list(sldIdLst):
+                sldIdLst.remove(sldId)
             return prs
         except Exception as e:
             print(f"Error loading template {template_name}: {e}")
-            return Presentation()
+            return _blank_presentation()
     else:
-        return Presentation()
+        return _blank_presentation()
     
 def fit_text_to_textbox(text_frame, text, max_font_size=16, min_font_size=10):
     """Intelligently fit text to text frame with proper sizing"""
@@ -506,21 +782,23 @@ def fit_text_to_textbox(text_frame, text, max_font_size=16, min_font_size=10):
     text_length = len(text)
     line_count = text.count('\n') + 1
     
-    if text_length > 300 or line_count > 6:
-        font_size = min_font_size
-    elif text_length > 200 or line_count > 4:
-        font_size = min_font_size + 2
-    elif text_length > 100 or line_count > 3:
-        font_size = max_font_size - 2
-    else:
-        font_size = max_font_size
-    
-    # Apply font size to all paragraphs
+    # (characters, lines, font size), checked from the densest text down
+    thresholds = (
+        (300, 6, min_font_size),
+        (200, 4, min_font_size + 2),
+        (100, 3, max_font_size - 2)
+    )
+    font_size = next((size for max_chars, max_lines, size in thresholds
+                      if text_length > max_chars or line_count > max_lines), max_font_size)
+    
+    # Apply font size to all paragraphs, sharing one Pt value of each kind
+    size_pt = Pt(font_size)
+    space_pt = Pt(6)
     for paragraph in text_frame.paragraphs:
-        paragraph.font.size = Pt(font_size)
-        paragraph.space_after = Pt(6)
+        paragraph.font.size = size_pt
+        paragraph.space_after = space_pt
         
-    return Pt(font_size)
+    return size_pt
 
 def create_enhanced_chart_slide(prs, title_text, chart_path, bullet_points, template=None):
     """Legacy function - now uses configurable chart slide creation"""